@@ -4,6 +4,7 @@ FastAPI main application
 
 from fastapi import FastAPI
 from api.routers.analytics import router as analytics_router
+from api.routers.exports import router as exports_router
 
 app = FastAPI(
     title="Medical Telegram Warehouse API",
@@ -12,6 +13,7 @@ app = FastAPI(
 )
 
 app.include_router(analytics_router)
+app.include_router(exports_router)
 
 
 @app.get("/")
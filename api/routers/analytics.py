@@ -6,20 +6,36 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from api.database import get_db
-from api.schemas import TopProduct, ChannelActivity, MessageSearchResult, VisualContentStats
+from api.schemas import TopProduct, ChannelActivity, MessageSearchResult, VisualContentStats, ProductPrice
 from typing import List
 
 router = APIRouter(prefix="/api", tags=["analytics"])
 
+# Joined in only when collapse_duplicates=true. For word counts only canonical
+# messages (and ones the dedup stage has not seen yet) are kept
+DEDUP_JOIN = """
+    LEFT JOIN public_marts.dim_message_clusters mc
+      ON f.message_id = mc.message_id AND f.channel_key = mc.channel_key
+"""
+DEDUP_FILTER = "AND COALESCE(mc.is_canonical, TRUE)"
+# Search keeps the best-ranked *matching* member of each cluster instead, so a
+# cluster whose canonical post does not match the query is still returned
+DEDUP_CLUSTER = """
+    COALESCE(mc.canonical_message_id, f.message_id),
+    COALESCE(mc.canonical_channel_key, f.channel_key)
+"""
+
 
 @router.get("/reports/top-products", response_model=List[TopProduct])
-def top_products(limit: int = 10, db: Session = Depends(get_db)):
+def top_products(limit: int = 10, collapse_duplicates: bool = False, db: Session = Depends(get_db)):
     """Top mentioned terms/products across all messages (simple word count)"""
-    query = text("""
+    query = text(f"""
     WITH words AS (
-        SELECT UNNEST(STRING_TO_ARRAY(LOWER(message_text), ' ')) AS word
-        FROM public_marts.fct_messages
-        WHERE message_text IS NOT NULL
+        SELECT UNNEST(STRING_TO_ARRAY(LOWER(f.message_text), ' ')) AS word
+        FROM public_marts.fct_messages f
+        {DEDUP_JOIN if collapse_duplicates else ""}
+        WHERE f.message_text IS NOT NULL
+        {DEDUP_FILTER if collapse_duplicates else ""}
     )
     SELECT word AS product_term, COUNT(*) AS mention_count
     FROM words
@@ -35,6 +51,44 @@ def top_products(limit: int = 10, db: Session = Depends(get_db)):
     return [{"product_term": row[0], "mention_count": row[1]} for row in result]
 
 
+@router.get("/products/{product_name}/prices", response_model=List[ProductPrice])
+def product_prices(product_name: str, db: Session = Depends(get_db)):
+    """Price range per channel for a product (by product name or brand/alias)"""
+    query = text("""
+    SELECT 
+        c.channel_name,
+        COUNT(*) AS mention_count,
+        MIN(p.price_etb) AS min_price_etb,
+        ROUND(AVG(p.price_etb), 2) AS avg_price_etb,
+        MAX(p.price_etb) AS max_price_etb,
+        DATE(MAX(p.message_timestamp)) AS last_seen
+    FROM public_marts.fct_product_mentions p
+    JOIN public_marts.dim_channels c ON p.channel_key = c.channel_key
+    WHERE LOWER(p.product_name) IN (
+        -- Aliases/brands (e.g. panadol, tylenol) resolve to the product name
+        SELECT LOWER(l.product_name)
+        FROM public_marts.product_lexicon l
+        WHERE l.term = LOWER(:product_name)
+        UNION
+        SELECT LOWER(:product_name)
+    )
+    GROUP BY c.channel_name
+    ORDER BY mention_count DESC
+    """)
+    result = db.execute(query, {"product_name": product_name}).fetchall()
+    if not result:
+        raise HTTPException(
+            status_code=404, detail=f"No mentions found for product '{product_name}'")
+    return [{
+        "channel_name": row[0],
+        "mention_count": row[1],
+        "min_price_etb": row[2],
+        "avg_price_etb": row[3],
+        "max_price_etb": row[4],
+        "last_seen": row[5]
+    } for row in result]
+
+
 @router.get("/channels/{channel_name}/activity", response_model=List[ChannelActivity])
 def channel_activity(channel_name: str, db: Session = Depends(get_db)):
     """Posting activity and trends for a specific channel"""
@@ -57,20 +111,26 @@ def channel_activity(channel_name: str, db: Session = Depends(get_db)):
 
 
 @router.get("/search/messages", response_model=List[MessageSearchResult])
-def search_messages(query: str, limit: int = 20, db: Session = Depends(get_db)):
-    """Search messages containing a keyword"""
+def search_messages(query: str, limit: int = 20, collapse_duplicates: bool = False, db: Session = Depends(get_db)):
+    """Search messages containing a keyword (optionally one result per repost cluster)"""
     search_term = f"%{query.lower()}%"
-    sql_query = text("""
-    SELECT 
-        f.message_id,
-        c.channel_name,
-        f.message_text,
-        f.view_count,
-        DATE(f.message_timestamp) AS message_timestamp
-    FROM public_marts.fct_messages f
-    JOIN public_marts.dim_channels c ON f.channel_key = c.channel_key
-    WHERE LOWER(f.message_text) LIKE :search_term
-    ORDER BY f.view_count DESC
+    sql_query = text(f"""
+    SELECT message_id, channel_name, message_text, view_count, message_timestamp, duplicate_count
+    FROM (
+        SELECT {f"DISTINCT ON ({DEDUP_CLUSTER})" if collapse_duplicates else ""}
+            f.message_id,
+            c.channel_name,
+            f.message_text,
+            f.view_count,
+            DATE(f.message_timestamp) AS message_timestamp,
+            {"mc.cluster_size" if collapse_duplicates else "NULL"} AS duplicate_count
+        FROM public_marts.fct_messages f
+        JOIN public_marts.dim_channels c ON f.channel_key = c.channel_key
+        {DEDUP_JOIN if collapse_duplicates else ""}
+        WHERE LOWER(f.message_text) LIKE :search_term
+        {f"ORDER BY {DEDUP_CLUSTER}, f.view_count DESC" if collapse_duplicates else ""}
+    ) matches
+    ORDER BY view_count DESC
     LIMIT :limit
     """)
     result = db.execute(
@@ -78,7 +138,7 @@ def search_messages(query: str, limit: int = 20, db: Session = Depends(get_db)):
     if not result:
         raise HTTPException(
             status_code=404, detail=f"No messages found for query '{query}'")
-    return [{"message_id": row[0], "channel_name": row[1], "message_text": row[2], "view_count": row[3], "message_timestamp": row[4]} for row in result]
+    return [{"message_id": row[0], "channel_name": row[1], "message_text": row[2], "view_count": row[3], "message_timestamp": row[4], "duplicate_count": row[5]} for row in result]
 
 
 @router.get("/reports/visual-content", response_model=List[VisualContentStats])
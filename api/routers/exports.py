@@ -0,0 +1,277 @@
+"""
+Bulk export endpoints router
+
+Rows are streamed from a server-side cursor in fixed-size chunks and encoded
+straight to NDJSON / CSV / Arrow IPC (no per-row Pydantic validation), so
+memory stays flat regardless of result size and the first bytes go out as
+soon as the first chunk is fetched.
+
+Optional dependencies: pyarrow (format=arrow), zstandard (compression=zstd)
+"""
+
+import csv
+import io
+import json
+import re
+import zlib
+from enum import Enum
+from typing import Optional
+from datetime import date
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from api.database import engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+# Rows fetched from the server-side cursor (and encoded) per chunk
+CHUNK_ROWS = 5000
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+    arrow = "arrow"
+
+
+class Compression(str, Enum):
+    none = "none"
+    gzip = "gzip"
+    zstd = "zstd"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+    ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+}
+
+
+# Anything outside [A-Za-z0-9_.-] in a download filename (quotes, non-Latin-1
+# channel names) would break or crash the Content-Disposition header
+UNSAFE_FILENAME_RE = re.compile(r"[^\w.-]", re.ASCII)
+
+
+# PostgreSQL type OID → Arrow type; anything else is exported as string
+PG_ARROW_TYPES = {
+    16: "bool",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    700: "float32",
+    701: "float64",
+    1700: "float64",  # numeric
+    1082: "date32",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+
+def stream_rows(query, params):
+    """Yield (column names, column type OIDs, list of row tuples) chunks from a
+    server-side cursor. The first chunk is always empty, so encoders can write
+    headers/schema even when the query returns no rows."""
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            yield_per=CHUNK_ROWS).execute(query, params)
+        columns = list(result.keys())
+        type_codes = [col[1] for col in result.cursor.description]
+        yield columns, type_codes, []
+        for rows in result.partitions():
+            yield columns, type_codes, [tuple(row) for row in rows]
+
+
+def encode_ndjson(chunks):
+    for columns, _, rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def encode_csv(chunks):
+    header_written = False
+    for columns, _, rows in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def arrow_type(type_code):
+    name = PG_ARROW_TYPES.get(type_code, "string")
+    if name == "timestamp":
+        return pa.timestamp("us")
+    if name == "timestamptz":
+        return pa.timestamp("us", tz="UTC")
+    return getattr(pa, name)()
+
+
+def arrow_column(values, type_):
+    if pa.types.is_floating(type_):
+        return [None if v is None else float(v) for v in values]  # Decimal
+    if pa.types.is_string(type_):
+        return [None if v is None else str(v) for v in values]
+    return values
+
+
+def encode_arrow(chunks):
+    # Schema comes from the cursor's column types, not from the values, so
+    # all-NULL columns and empty results still produce a valid stream
+    sink = io.BytesIO()
+    writer = None
+    schema = None
+    for columns, type_codes, rows in chunks:
+        if writer is None:
+            schema = pa.schema([(name, arrow_type(code))
+                                for name, code in zip(columns, type_codes)])
+            writer = pa.ipc.new_stream(sink, schema)
+        if rows:
+            batch = pa.RecordBatch.from_arrays([
+                pa.array(arrow_column([row[i] for row in rows], field.type),
+                         type=field.type)
+                for i, field in enumerate(schema)
+            ], schema=schema)
+            writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+
+    if writer is not None:
+        writer.close()
+        yield sink.getvalue()
+
+
+def compress(chunks, compression):
+    if compression == Compression.none:
+        yield from chunks
+        return
+
+    if compression == Compression.gzip:
+        compressor = zlib.compressobj(wbits=31)  # 31 → gzip container
+    else:
+        compressor = zstandard.ZstdCompressor().compressobj()
+
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def export_response(query, params, format: ExportFormat, compression: Compression, filename: str):
+    if format == ExportFormat.arrow and pa is None:
+        raise HTTPException(
+            status_code=400, detail="Arrow export requires pyarrow to be installed")
+    if compression == Compression.zstd and zstandard is None:
+        raise HTTPException(
+            status_code=400, detail="zstd compression requires zstandard to be installed")
+
+    encoder = {
+        ExportFormat.ndjson: encode_ndjson,
+        ExportFormat.csv: encode_csv,
+        ExportFormat.arrow: encode_arrow,
+    }[format]
+
+    filename = UNSAFE_FILENAME_RE.sub("_", filename)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{format.value}"'}
+    if compression != Compression.none:
+        headers["Content-Encoding"] = compression.value
+
+    return StreamingResponse(
+        compress(encoder(stream_rows(query, params)), compression),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@router.get("/messages")
+def export_messages(
+    channel_name: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: ExportFormat = ExportFormat.ndjson,
+    compression: Compression = Compression.none,
+):
+    """All messages (optionally filtered by channel / date range)"""
+    query = text("""
+    SELECT
+        f.message_id,
+        c.channel_name,
+        f.message_timestamp,
+        f.message_text,
+        f.view_count,
+        f.forward_count,
+        f.has_image
+    FROM public_marts.fct_messages f
+    JOIN public_marts.dim_channels c ON f.channel_key = c.channel_key
+    WHERE (CAST(:channel_name AS TEXT) IS NULL OR LOWER(c.channel_name) = LOWER(:channel_name))
+      AND (CAST(:start_date AS DATE) IS NULL OR f.message_timestamp >= :start_date)
+      AND (CAST(:end_date AS DATE) IS NULL OR f.message_timestamp < CAST(:end_date AS DATE) + 1)
+    ORDER BY f.message_timestamp
+    """)
+    params = {"channel_name": channel_name,
+              "start_date": start_date, "end_date": end_date}
+    return export_response(query, params, format, compression, "messages")
+
+
+@router.get("/channels/{channel_name}/activity")
+def export_channel_activity(
+    channel_name: str,
+    format: ExportFormat = ExportFormat.ndjson,
+    compression: Compression = Compression.none,
+):
+    """Daily posting activity for a channel (streaming version of /api/channels/{channel_name}/activity)"""
+    query = text("""
+    SELECT
+        DATE(message_timestamp) AS post_date,
+        COUNT(*) AS message_count,
+        AVG(view_count)::float8 AS avg_views
+    FROM public_marts.fct_messages f
+    JOIN public_marts.dim_channels c ON f.channel_key = c.channel_key
+    WHERE LOWER(c.channel_name) = LOWER(:channel_name)
+    GROUP BY post_date
+    ORDER BY post_date DESC
+    """)
+    return export_response(query, {"channel_name": channel_name}, format, compression,
+                           f"{channel_name}_activity")
+
+
+@router.get("/visual-content")
+def export_visual_content(
+    format: ExportFormat = ExportFormat.ndjson,
+    compression: Compression = Compression.none,
+):
+    """Image usage per channel (streaming version of /api/reports/visual-content)"""
+    query = text("""
+    SELECT
+        c.channel_name,
+        COUNT(y.message_id) AS total_images,
+        SUM(CASE WHEN y.image_category = 'promotional' THEN 1 ELSE 0 END) AS promotional_count,
+        SUM(CASE WHEN y.image_category = 'product_display' THEN 1 ELSE 0 END) AS product_display_count,
+        SUM(CASE WHEN y.image_category = 'lifestyle' THEN 1 ELSE 0 END) AS lifestyle_count,
+        SUM(CASE WHEN y.image_category = 'other' THEN 1 ELSE 0 END) AS other_count,
+        COALESCE(ROUND(COUNT(y.message_id)::numeric / COUNT(f.message_id) * 100, 1), 0)::float8 AS visual_percentage
+    FROM public_marts.fct_messages f
+    LEFT JOIN public_marts.fct_image_detections y USING (message_id)
+    JOIN public_marts.dim_channels c ON f.channel_key = c.channel_key
+    GROUP BY c.channel_name
+    ORDER BY total_images DESC
+    """)
+    return export_response(query, {}, format, compression, "visual_content")
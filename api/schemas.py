@@ -24,6 +24,7 @@ class MessageSearchResult(BaseModel):
     message_text: str
     view_count: int
     message_timestamp: date
+    duplicate_count: Optional[int] = None  # cluster size when collapse_duplicates=true
 
 
 class VisualContentStats(BaseModel):
@@ -34,3 +35,12 @@ class VisualContentStats(BaseModel):
     lifestyle_count: int
     other_count: int
     visual_percentage: float
+
+
+class ProductPrice(BaseModel):
+    channel_name: str
+    mention_count: int
+    min_price_etb: Optional[float]
+    avg_price_etb: Optional[float]
+    max_price_etb: Optional[float]
+    last_seen: date
@@ -18,7 +18,9 @@ WITH channel_stats AS (
 )
 
 SELECT
-  ROW_NUMBER() OVER (ORDER BY channel_username) AS channel_key,
+  -- Hash of the username (not ROW_NUMBER) so keys stay stable when new
+  -- channels appear; the incremental fct_messages relies on this
+  MD5(channel_username) AS channel_key,
   channel_username AS channel_name,
   channel_title,
   CASE 
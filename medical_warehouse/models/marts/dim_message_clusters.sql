@@ -0,0 +1,27 @@
+{{
+  config(
+    materialized = 'table',
+    schema = 'marts'
+  )
+}}
+
+WITH clusters AS (
+  SELECT *
+  FROM {{ source('raw', 'message_clusters') }}
+)
+
+SELECT
+  mc.message_id,
+  c.channel_key,
+  mc.canonical_message_id,
+  cc.channel_key AS canonical_channel_key,
+  mc.similarity,
+  (mc.message_id = mc.canonical_message_id
+    AND mc.channel_username = mc.canonical_channel_username) AS is_canonical,
+  COUNT(*) OVER (
+    PARTITION BY mc.canonical_message_id, mc.canonical_channel_username
+  ) AS cluster_size,
+  mc.clustered_at
+FROM clusters mc
+JOIN {{ ref('dim_channels') }} c ON mc.channel_username = c.channel_name
+JOIN {{ ref('dim_channels') }} cc ON mc.canonical_channel_username = cc.channel_name
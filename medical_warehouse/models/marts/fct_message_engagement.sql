@@ -0,0 +1,24 @@
+{{
+  config(
+    materialized = 'table',
+    schema = 'marts'
+  )
+}}
+
+-- One row per counter change captured by `scraper.py --refresh-counters`
+SELECT
+  s.message_id,
+  c.channel_key,
+  d.date_key,
+  s.captured_at,
+  EXTRACT(EPOCH FROM (s.captured_at - f.message_timestamp)) / 3600 AS hours_since_post,
+  s.views AS view_count,
+  s.forwards AS forward_count,
+  s.views_delta,
+  s.forwards_delta
+FROM {{ source('raw', 'message_counter_snapshots') }} s
+JOIN {{ ref('dim_channels') }} c ON s.channel_username = c.channel_name
+JOIN {{ ref('fct_messages') }} f
+  ON s.message_id = f.message_id
+ AND c.channel_key = f.channel_key
+JOIN {{ ref('dim_dates') }} d ON DATE(s.captured_at) = d.full_date
@@ -1,6 +1,7 @@
 {{
   config(
-    materialized = 'table',
+    materialized = 'incremental',
+    unique_key = ['message_id', 'channel_key'],
     schema = 'marts'
   )
 }}
@@ -14,7 +15,12 @@ SELECT
   s.message_length,
   s.view_count,
   s.forward_count,
-  s.has_image
+  s.has_image,
+  s.loaded_at
 FROM {{ ref('stg_telegram_messages') }} s
 JOIN {{ ref('dim_channels') }} c ON s.channel_username = c.channel_name
-JOIN {{ ref('dim_dates') }} d ON DATE(s.message_timestamp) = d.full_date
\ No newline at end of file
+JOIN {{ ref('dim_dates') }} d ON DATE(s.message_timestamp) = d.full_date
+{% if is_incremental() %}
+-- Streaming mode: only merge rows (up)serted since the last build
+WHERE s.loaded_at > (SELECT MAX(loaded_at) FROM {{ this }})
+{% endif %}
\ No newline at end of file
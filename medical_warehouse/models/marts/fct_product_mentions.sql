@@ -0,0 +1,23 @@
+{{
+  config(
+    materialized = 'table',
+    schema = 'marts'
+  )
+}}
+
+SELECT
+  p.message_id,
+  c.channel_key,
+  f.date_key,
+  f.message_timestamp,
+  p.product_name,
+  p.matched_term,
+  p.category,
+  p.price,
+  p.currency,
+  p.price_etb
+FROM {{ source('raw', 'product_mentions') }} p
+JOIN {{ ref('dim_channels') }} c ON p.channel_username = c.channel_name
+JOIN {{ ref('fct_messages') }} f
+  ON p.message_id = f.message_id
+ AND c.channel_key = f.channel_key
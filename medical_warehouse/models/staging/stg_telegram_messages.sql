@@ -8,23 +8,38 @@
 WITH source AS (
   SELECT *
   FROM {{ source('raw', 'telegram_messages') }}
+),
+
+-- Latest refreshed counters (raw values are captured once at scrape time)
+latest_counters AS (
+  SELECT DISTINCT ON (message_id, channel_username)
+    message_id,
+    channel_username,
+    views,
+    forwards
+  FROM {{ source('raw', 'message_counter_snapshots') }}
+  ORDER BY message_id, channel_username, captured_at DESC
 )
 
 SELECT
-  message_id,
-  channel_username,
-  channel_title,
-  date::timestamptz AS message_timestamp,
-  text AS message_text,
-  views AS view_count,
-  forwards AS forward_count,
-  has_media,
-  image_path,
-  LENGTH(text) AS message_length,
-  CASE WHEN image_path IS NOT NULL THEN TRUE ELSE FALSE END AS has_image,
-  DATE(date) AS message_date
-FROM source
+  s.message_id,
+  s.channel_username,
+  s.channel_title,
+  s.date::timestamptz AS message_timestamp,
+  s.text AS message_text,
+  GREATEST(s.views, lc.views) AS view_count,
+  GREATEST(s.forwards, lc.forwards) AS forward_count,
+  s.has_media,
+  s.image_path,
+  LENGTH(s.text) AS message_length,
+  CASE WHEN s.image_path IS NOT NULL THEN TRUE ELSE FALSE END AS has_image,
+  DATE(s.date) AS message_date,
+  s.loaded_at
+FROM source s
+LEFT JOIN latest_counters lc
+  ON s.message_id = lc.message_id
+ AND s.channel_username = lc.channel_username
 WHERE 
-  text IS NOT NULL 
-  AND text != ''
-  AND date IS NOT NULL
\ No newline at end of file
+  s.text IS NOT NULL 
+  AND s.text != ''
+  AND s.date IS NOT NULL
\ No newline at end of file
@@ -1,16 +1,43 @@
 """
 Dagster pipeline for Medical Telegram Warehouse
-Runs: scrape → load raw → dbt build → YOLO enrichment
+Runs: scrape → load raw → dedup → dbt build → product extraction → YOLO enrichment
+Streaming job (every 15 min): scrape --stream → dedup → incremental dbt → product extraction
+Engagement job (hourly): refresh views/forwards → incremental dbt
+
+The three jobs share the Telethon session file, raw.telegram_messages and the
+marts, so they must never run at the same time: schedules are offset, runs
+are tagged and limited to one at a time by the run queue (.dagster/dagster.yaml), and
+the frequent schedules skip a tick while another warehouse run is in flight.
 """
 
 from dagster import job, op, schedule, repository, define_asset_job, AssetGroup
-from dagster import RunConfig
+from dagster import RunConfig, RunsFilter, DagsterRunStatus, SkipReason
 import subprocess
 import os
 
 # Change to project root if needed (Dagster runs from where you launch)
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+# Run-queue limit of 1 for this tag is configured in .dagster/dagster.yaml
+WAREHOUSE_RUN_TAGS = {"warehouse_writer": "telegram"}
+
+IN_PROGRESS_STATUSES = [
+    DagsterRunStatus.QUEUED,
+    DagsterRunStatus.NOT_STARTED,
+    DagsterRunStatus.STARTING,
+    DagsterRunStatus.STARTED,
+]
+
+
+def warehouse_run_in_progress(instance):
+    """True if any of the warehouse jobs is queued or running"""
+    runs = instance.get_runs(
+        filters=RunsFilter(tags=WAREHOUSE_RUN_TAGS,
+                           statuses=IN_PROGRESS_STATUSES),
+        limit=1,
+    )
+    return len(runs) > 0
+
 
 @op
 def scrape_telegram_data():
@@ -23,6 +50,28 @@ def scrape_telegram_data():
     print(result.stdout)
 
 
+@op
+def stream_scrape_telegram_data():
+    """Fetch only new posts and upsert them straight into raw.telegram_messages"""
+    result = subprocess.run(
+        ["uv", "run", "python", "src/scraper.py", "--stream"], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Streaming scrape failed: {result.stderr}")
+    print("Streaming scrape completed")
+    print(result.stdout)
+
+
+@op
+def refresh_engagement_counters():
+    """Re-fetch views/forwards of recent messages (delta snapshots)"""
+    result = subprocess.run(
+        ["uv", "run", "python", "src/scraper.py", "--refresh-counters"], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Counter refresh failed: {result.stderr}")
+    print("Counter refresh completed")
+    print(result.stdout)
+
+
 @op
 def load_raw_to_postgres():
     """Load raw JSONL to PostgreSQL (Task 1 loader)"""
@@ -34,12 +83,23 @@ def load_raw_to_postgres():
     print(result.stdout)
 
 
+@op
+def deduplicate_messages():
+    """Cluster reposted/near-identical messages (MinHash/LSH, incremental)"""
+    result = subprocess.run(
+        ["uv", "run", "python", "src/dedup_messages.py"], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Deduplication failed: {result.stderr}")
+    print("Deduplication completed")
+    print(result.stdout)
+
+
 @op
 def run_dbt_transformations():
     """Run dbt models (Task 2 warehouse build)"""
     os.chdir("medical_warehouse")
     result = subprocess.run(
-        ["dbt", "run", "--full-refresh"], capture_output=True, text=True)
+        ["dbt", "run", "--full-refresh", "--exclude", "fct_product_mentions"], capture_output=True, text=True)
     os.chdir("..")  # back to root
     if result.returncode != 0:
         raise Exception(f"dbt run failed: {result.stderr}")
@@ -47,6 +107,58 @@ def run_dbt_transformations():
     print(result.stdout)
 
 
+@op
+def refresh_marts_incremental():
+    """Merge newly streamed messages into the marts (no full rebuild)"""
+    os.chdir("medical_warehouse")
+    result = subprocess.run(
+        ["dbt", "run", "--select", "dim_channels", "fct_messages", "dim_message_clusters"],
+        capture_output=True, text=True)
+    os.chdir("..")
+    if result.returncode != 0:
+        raise Exception(f"Incremental dbt run failed: {result.stderr}")
+    print("Incremental mart refresh completed")
+    print(result.stdout)
+
+
+@op
+def refresh_engagement_marts():
+    """Merge refreshed counters into the marts and rebuild engagement facts"""
+    os.chdir("medical_warehouse")
+    result = subprocess.run(
+        ["dbt", "run", "--select", "dim_channels", "fct_messages", "fct_message_engagement"],
+        capture_output=True, text=True)
+    os.chdir("..")
+    if result.returncode != 0:
+        raise Exception(f"Engagement dbt run failed: {result.stderr}")
+    print("Engagement mart refresh completed")
+    print(result.stdout)
+
+
+@op
+def extract_product_mentions():
+    """Extract products + prices from new staged messages, then build the mart"""
+    extract_result = subprocess.run(
+        ["uv", "run", "python", "src/extract_products.py"], capture_output=True, text=True)
+    if extract_result.returncode != 0:
+        raise Exception(f"Product extraction failed: {extract_result.stderr}")
+
+    os.chdir("medical_warehouse")
+    seed_result = subprocess.run(
+        ["dbt", "seed", "--select", "product_lexicon"], capture_output=True, text=True)
+    dbt_result = subprocess.run(
+        ["dbt", "run", "--select", "fct_product_mentions"], capture_output=True, text=True)
+    os.chdir("..")
+    if seed_result.returncode != 0:
+        raise Exception(f"product_lexicon seed failed: {seed_result.stderr}")
+    if dbt_result.returncode != 0:
+        raise Exception(f"fct_product_mentions build failed: {dbt_result.stderr}")
+
+    print("Product extraction completed")
+    print(extract_result.stdout)
+    print(dbt_result.stdout)
+
+
 @op
 def run_yolo_enrichment():
     """Run YOLO detection and load to DB (Task 3)"""
@@ -67,11 +179,24 @@ def run_yolo_enrichment():
     print(load_result.stdout)
 
 
-@job
+@job(tags=WAREHOUSE_RUN_TAGS)
 def medical_warehouse_pipeline():
     """Full pipeline job with dependencies"""
-    run_yolo_enrichment(run_dbt_transformations(
-        load_raw_to_postgres(scrape_telegram_data())))
+    run_yolo_enrichment(extract_product_mentions(run_dbt_transformations(
+        deduplicate_messages(load_raw_to_postgres(scrape_telegram_data())))))
+
+
+@job(tags=WAREHOUSE_RUN_TAGS)
+def medical_warehouse_streaming():
+    """Near-real-time refresh: new posts reach the API within minutes"""
+    extract_product_mentions(refresh_marts_incremental(
+        deduplicate_messages(stream_scrape_telegram_data())))
+
+
+@job(tags=WAREHOUSE_RUN_TAGS)
+def medical_warehouse_engagement():
+    """Keep views/forwards (avg_views, search ranking) current"""
+    refresh_engagement_marts(refresh_engagement_counters())
 
 # Optional: Daily schedule (runs at 2 AM EAT)
 
@@ -81,6 +206,24 @@ def daily_pipeline_schedule():
     return RunConfig()
 
 
+# :05/:20/:35/:50 – never on the hour, so it does not collide with the 02:00 daily run
+@schedule(cron_schedule="5-59/15 * * * *", job=medical_warehouse_streaming, execution_timezone="Africa/Addis_Ababa")
+def streaming_refresh_schedule(context):
+    if warehouse_run_in_progress(context.instance):
+        return SkipReason("Another warehouse run (daily/streaming/engagement) is in progress")
+    return RunConfig()
+
+
+# :40 – between the streaming ticks
+@schedule(cron_schedule="40 * * * *", job=medical_warehouse_engagement, execution_timezone="Africa/Addis_Ababa")
+def hourly_engagement_schedule(context):
+    if warehouse_run_in_progress(context.instance):
+        return SkipReason("Another warehouse run (daily/streaming/engagement) is in progress")
+    return RunConfig()
+
+
 @repository
 def medical_warehouse_repo():
-    return [medical_warehouse_pipeline, daily_pipeline_schedule]
+    return [medical_warehouse_pipeline, daily_pipeline_schedule,
+            medical_warehouse_streaming, streaming_refresh_schedule,
+            medical_warehouse_engagement, hourly_engagement_schedule]
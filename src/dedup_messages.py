@@ -0,0 +1,319 @@
+"""
+Message Deduplication / Repost Detection
+----------------------------------------
+Clusters near-identical message texts (within and across channels) using
+MinHash signatures + LSH banding over normalized message text.
+
+Runs incrementally: only messages in raw.telegram_messages that have not been
+clustered yet are processed. Each new message is compared against a persistent
+signature index of canonical messages and either joins an existing cluster or
+becomes a new canonical message.
+
+Run: uv run python src/dedup_messages.py
+
+Output tables (schema raw):
+    message_signatures    MinHash signature of every canonical message
+    message_lsh_buckets   LSH band buckets -> canonical message (lookup index)
+    message_clusters      every processed message -> its canonical message
+"""
+
+import hashlib
+import logging
+import os
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+load_dotenv()
+
+LOGS_DIR = Path("logs")
+LOGS_DIR.mkdir(parents=True, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)-8s | %(message)s",
+    handlers=[
+        logging.FileHandler(LOGS_DIR / "dedup_messages.log", encoding="utf-8"),
+        logging.StreamHandler(),
+    ],
+)
+logger = logging.getLogger(__name__)
+
+# ─── MINHASH / LSH SETTINGS
+# 16 bands x 8 rows -> candidate pairs start appearing around ~0.7 Jaccard,
+# candidates are then verified against SIMILARITY_THRESHOLD.
+NUM_PERM = 128
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed so signatures stay comparable between runs
+_rng = np.random.RandomState(42)
+PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+|t\.me/\S+")
+MENTION_RE = re.compile(r"@\w+")
+# A number, optionally followed by a dosage/size unit ("500mg", "100 ml").
+# Percentages are not a unit here: "10% off" vs "20% off" is a repost
+NUMBER_RE = re.compile(
+    r"\d+(?:[.,]\d+)*(?P<unit>\s*(?:mg|mcg|µg|ml|g|kg|l|iu)(?!\w))?")
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def get_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "medical_warehouse"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", 5432)
+    )
+
+
+def create_tables(cur):
+    cur.execute("""
+    CREATE SCHEMA IF NOT EXISTS raw;
+
+    CREATE TABLE IF NOT EXISTS raw.message_signatures (
+        message_id       BIGINT,
+        channel_username TEXT,
+        signature        BIGINT[],
+        dosages          TEXT[],
+        PRIMARY KEY (message_id, channel_username)
+    );
+    ALTER TABLE raw.message_signatures ADD COLUMN IF NOT EXISTS dosages TEXT[];
+
+    CREATE TABLE IF NOT EXISTS raw.message_lsh_buckets (
+        band             SMALLINT,
+        bucket           BIGINT,
+        message_id       BIGINT,
+        channel_username TEXT
+    );
+    CREATE INDEX IF NOT EXISTS message_lsh_buckets_band_bucket_idx
+        ON raw.message_lsh_buckets (band, bucket);
+
+    CREATE TABLE IF NOT EXISTS raw.message_clusters (
+        message_id                 BIGINT,
+        channel_username           TEXT,
+        canonical_message_id       BIGINT,
+        canonical_channel_username TEXT,
+        similarity                 REAL,
+        clustered_at               TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (message_id, channel_username)
+    );
+    """)
+
+
+def _mask_number(match):
+    # Dosages tell products apart ("500mg" vs "1000mg") and are kept; any
+    # other number (price, phone, date) is masked
+    if match.group("unit"):
+        return re.sub(r"\s+", "", match.group(0))
+    return "0"
+
+
+def dosage_tokens(text):
+    """Dosages/sizes in the text, e.g. {"500mg", "100ml"}"""
+    return frozenset(
+        re.sub(r"\s+", "", m.group(0))
+        for m in NUMBER_RE.finditer(text.lower()) if m.group("unit"))
+
+
+def normalize_text(text):
+    """Lowercase, drop links/mentions/punctuation and mask numbers other than
+    dosages (reposts often only change the price or phone number)"""
+    text = text.lower()
+    text = URL_RE.sub(" ", text)
+    text = MENTION_RE.sub(" ", text)
+    text = NUMBER_RE.sub(_mask_number, text)
+    text = NON_WORD_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def minhash_signature(text):
+    """MinHash signature over character shingles, or None if text is empty"""
+    if not text:
+        return None
+
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE]
+                    for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    permuted = (PERM_A[:, None] * hashes[None, :] +
+                PERM_B[:, None]) % MERSENNE_PRIME & MAX_HASH
+    return permuted.min(axis=1)
+
+
+def lsh_buckets(signature):
+    """One 64-bit bucket id per band"""
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "big", signed=True)))
+    return buckets
+
+
+def fetch_new_messages(cur):
+    cur.execute("""
+    SELECT m.message_id, m.channel_username, m.text
+    FROM raw.telegram_messages m
+    LEFT JOIN raw.message_clusters c
+      ON m.message_id = c.message_id
+     AND m.channel_username = c.channel_username
+    WHERE c.message_id IS NULL
+      AND m.text IS NOT NULL
+      AND m.text != ''
+    ORDER BY m.date, m.message_id
+    """)
+    return cur.fetchall()
+
+
+def load_candidates(cur, buckets):
+    """Look up canonical messages sharing any of the given buckets.
+
+    Returns (bucket -> [message keys], message key -> (signature, dosages))
+    """
+    index = {}
+    signatures = {}
+    if not buckets:
+        return index, signatures
+
+    cur.execute("""
+    CREATE TEMP TABLE new_buckets (band SMALLINT, bucket BIGINT) ON COMMIT DROP
+    """)
+    execute_values(
+        cur, "INSERT INTO new_buckets (band, bucket) VALUES %s", list(buckets))
+    cur.execute("""
+    SELECT DISTINCT b.band, b.bucket, b.message_id, b.channel_username, s.signature, s.dosages
+    FROM new_buckets n
+    JOIN raw.message_lsh_buckets b
+      ON b.band = n.band AND b.bucket = n.bucket
+    JOIN raw.message_signatures s
+      ON s.message_id = b.message_id AND s.channel_username = b.channel_username
+    """)
+    for band, bucket, message_id, channel_username, signature, dosages in cur:
+        key = (message_id, channel_username)
+        index.setdefault((band, bucket), []).append(key)
+        if key not in signatures:
+            signatures[key] = (np.array(signature, dtype=np.uint64),
+                               frozenset(dosages or ()))
+
+    return index, signatures
+
+
+def cluster_messages(messages, index, signatures):
+    """Assign every message to a canonical message (possibly itself).
+
+    `index` and `signatures` are updated in place with new canonical messages
+    so duplicates within the same run are caught too. Messages with different
+    dosages ("500mg" vs "1000mg") are never clustered together.
+    """
+    clusters = []
+    new_signatures = []
+    new_buckets = []
+
+    for message_id, channel_username, signature, buckets, dosages in messages:
+        key = (message_id, channel_username)
+
+        if signature is None:
+            clusters.append((message_id, channel_username,
+                            message_id, channel_username, 1.0))
+            continue
+
+        candidates = {c for b in buckets for c in index.get(b, ())}
+        best_key, best_similarity = None, 0.0
+        for candidate in candidates:
+            candidate_signature, candidate_dosages = signatures[candidate]
+            if candidate_dosages != dosages:
+                continue
+            similarity = float(np.mean(candidate_signature == signature))
+            if similarity > best_similarity:
+                best_key, best_similarity = candidate, similarity
+
+        if best_key is not None and best_similarity >= SIMILARITY_THRESHOLD:
+            clusters.append((message_id, channel_username,
+                            best_key[0], best_key[1], best_similarity))
+            continue
+
+        # New canonical message -> add to the signature index
+        clusters.append((message_id, channel_username,
+                        message_id, channel_username, 1.0))
+        signatures[key] = (signature, dosages)
+        new_signatures.append((message_id, channel_username,
+                               [int(v) for v in signature], sorted(dosages)))
+        for band, bucket in buckets:
+            index.setdefault((band, bucket), []).append(key)
+            new_buckets.append((band, bucket, message_id, channel_username))
+
+    return clusters, new_signatures, new_buckets
+
+
+def main():
+    conn = get_connection()
+    cur = conn.cursor()
+    create_tables(cur)
+
+    rows = fetch_new_messages(cur)
+    if not rows:
+        logger.info("No new messages to deduplicate")
+        conn.commit()
+        cur.close()
+        conn.close()
+        return
+
+    messages = []
+    all_buckets = set()
+    for message_id, channel_username, text in rows:
+        signature = minhash_signature(normalize_text(text))
+        buckets = lsh_buckets(signature) if signature is not None else []
+        all_buckets.update(buckets)
+        messages.append((message_id, channel_username,
+                        signature, buckets, dosage_tokens(text)))
+
+    index, signatures = load_candidates(cur, all_buckets)
+    clusters, new_signatures, new_buckets = cluster_messages(
+        messages, index, signatures)
+
+    execute_values(cur, """
+    INSERT INTO raw.message_signatures (message_id, channel_username, signature, dosages)
+    VALUES %s ON CONFLICT DO NOTHING
+    """, new_signatures)
+    execute_values(cur, """
+    INSERT INTO raw.message_lsh_buckets (band, bucket, message_id, channel_username)
+    VALUES %s
+    """, new_buckets)
+    execute_values(cur, """
+    INSERT INTO raw.message_clusters (
+        message_id, channel_username, canonical_message_id, canonical_channel_username, similarity
+    ) VALUES %s ON CONFLICT DO NOTHING
+    """, clusters)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    duplicates = sum(1 for c in clusters if (c[0], c[1]) != (c[2], c[3]))
+    logger.info(
+        f"Deduplicated {len(clusters):,} new messages → "
+        f"{len(new_signatures):,} canonical, {duplicates:,} reposts")
+
+
+if __name__ == "__main__":
+    main()
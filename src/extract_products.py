@@ -0,0 +1,267 @@
+"""
+Product & Price Extraction
+--------------------------
+Finds drug/brand mentions and prices in message text.
+
+- Products: lexicon (medical_warehouse/seeds/product_lexicon.csv) compiled
+  once into a single trie-shaped regex, so matching every term is one pass
+  over the text regardless of lexicon size
+- Prices: amount + currency (ETB / birr / br / ብር / USD / $) or "price: 350"
+- Each product mention gets the nearest price that follows it in the message
+
+Runs incrementally over stg_telegram_messages rows not processed before.
+
+Run: uv run python src/extract_products.py
+
+Output tables (schema raw):
+    product_mentions          one row per (message, product) with price in ETB
+    product_extraction_log    messages already processed (incl. no mentions)
+
+Environment variables (optional):
+    USD_ETB_RATE    exchange rate used to convert USD prices to ETB
+"""
+
+import csv
+import logging
+import os
+import re
+from pathlib import Path
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+load_dotenv()
+
+LOGS_DIR = Path("logs")
+LOGS_DIR.mkdir(parents=True, exist_ok=True)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)-8s | %(message)s",
+    handlers=[
+        logging.FileHandler(LOGS_DIR / "extract_products.log",
+                            encoding="utf-8"),
+        logging.StreamHandler(),
+    ],
+)
+logger = logging.getLogger(__name__)
+
+LEXICON_CSV = Path("medical_warehouse/seeds/product_lexicon.csv")
+STAGING_TABLE = "public_staging.stg_telegram_messages"
+BATCH_SIZE = 10_000
+
+USD_ETB_RATE = float(os.getenv("USD_ETB_RATE")
+                     ) if os.getenv("USD_ETB_RATE") else None
+
+# ─── PRICE PATTERNS
+AMOUNT = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+CURRENCY = r"etb|birr|br|ብር|usd|\$"
+# A number followed by one of these is a dosage/size or a percentage, not a
+# price (dedup_messages.NUMBER_RE units + %); also rules out backtracking to a
+# shorter number
+NOT_DOSAGE = r"(?!\d|[.,]\d|\s*(?:mg|mcg|µg|ml|g|kg|l|iu|%)(?!\w))"
+PRICE_RE = re.compile(
+    rf"(?:(?<!\w)(?P<cur_before>{CURRENCY})\s*[:.]?\s*(?P<amount_after>{AMOUNT}))"
+    rf"|(?:(?P<amount_before>{AMOUNT})\s*(?P<cur_after>{CURRENCY})(?!\w))"
+    rf"|(?:(?:price|ዋጋ)\s*[:\-=]?\s*(?P<amount_only>{AMOUNT}){NOT_DOSAGE}"
+    rf"(?:\s*(?P<cur_price>{CURRENCY})(?!\w))?)",
+    re.IGNORECASE,
+)
+# Anything larger is a phone number / id next to "price:" or "ETB", not a price
+# (also keeps values well inside NUMERIC(12, 2))
+MAX_PRICE = 1_000_000
+CURRENCY_CODES = {"etb": "ETB", "birr": "ETB", "br": "ETB", "ብር": "ETB",
+                  "usd": "USD", "$": "USD"}
+
+
+def load_lexicon(path=LEXICON_CSV):
+    """term (lowercase) -> (product_name, category)"""
+    with open(path, encoding="utf-8") as f:
+        return {row["term"].strip().lower(): (row["product_name"], row["category"])
+                for row in csv.DictReader(f)}
+
+
+def _trie_to_regex(trie):
+    """Turn a nested-dict trie into a regex, sharing common prefixes"""
+    if "" in trie and len(trie) == 1:
+        return ""
+
+    alternatives = []
+    optional = False
+    for char in sorted(trie):
+        if char == "":
+            optional = True
+            continue
+        alternatives.append(re.escape(char) + _trie_to_regex(trie[char]))
+
+    if len(alternatives) == 1 and not optional:
+        return alternatives[0]
+    pattern = "(?:" + "|".join(alternatives) + ")"
+    return pattern + "?" if optional else pattern
+
+
+def build_matcher(terms):
+    """Compile all lexicon terms into one whole-word regex"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(rf"(?<!\w){_trie_to_regex(trie)}(?!\w)")
+
+
+def parse_amount(amount):
+    return float(amount.replace(",", ""))
+
+
+def find_prices(text):
+    """[(start, price, currency)] in order of appearance"""
+    prices = []
+    for m in PRICE_RE.finditer(text):
+        amount = m.group("amount_after") or m.group(
+            "amount_before") or m.group("amount_only")
+        currency = m.group("cur_before") or m.group(
+            "cur_after") or m.group("cur_price")
+        code = CURRENCY_CODES[currency.lower()] if currency else "ETB"
+        price = parse_amount(amount)
+        if 0 < price <= MAX_PRICE:
+            prices.append((m.start(), price, code))
+    return prices
+
+
+def to_etb(price, currency):
+    if currency == "ETB":
+        return price
+    if currency == "USD" and USD_ETB_RATE:
+        return round(price * USD_ETB_RATE, 2)
+    return None
+
+
+def extract_mentions(text, matcher, lexicon):
+    """[(product_name, matched_term, category, price, currency, price_etb)]
+
+    A product takes the first price between it and the next product; if the
+    message has a single price, every product without one gets that price.
+    """
+    lowered = text.lower()
+    matches = list(matcher.finditer(lowered))
+    if not matches:
+        return []
+
+    prices = find_prices(lowered)
+    mentions = {}
+    for i, m in enumerate(matches):
+        term = m.group(0)
+        product_name, category = lexicon[term]
+        if product_name in mentions:
+            continue
+
+        next_start = matches[i + 1].start() if i + 1 < len(matches) else len(lowered)
+        price = next((p for p in prices if m.end() <= p[0] < next_start), None)
+        if price is None and len(prices) == 1:
+            price = prices[0]
+
+        amount, currency = (price[1], price[2]) if price else (None, None)
+        mentions[product_name] = (product_name, term, category, amount, currency,
+                                  to_etb(amount, currency) if price else None)
+
+    return list(mentions.values())
+
+
+def get_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "medical_warehouse"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", 5432)
+    )
+
+
+def create_tables(cur):
+    cur.execute("""
+    CREATE SCHEMA IF NOT EXISTS raw;
+
+    CREATE TABLE IF NOT EXISTS raw.product_mentions (
+        message_id       BIGINT,
+        channel_username TEXT,
+        product_name     TEXT,
+        matched_term     TEXT,
+        category         TEXT,
+        price            NUMERIC(12, 2),
+        currency         TEXT,
+        price_etb        NUMERIC(12, 2),
+        extracted_at     TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (message_id, channel_username, product_name)
+    );
+
+    CREATE TABLE IF NOT EXISTS raw.product_extraction_log (
+        message_id       BIGINT,
+        channel_username TEXT,
+        extracted_at     TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (message_id, channel_username)
+    );
+    """)
+
+
+def main():
+    lexicon = load_lexicon()
+    matcher = build_matcher(lexicon)
+    logger.info(f"Loaded {len(lexicon):,} lexicon terms")
+
+    conn = get_connection()
+    cur = conn.cursor()
+    create_tables(cur)
+    conn.commit()
+
+    # Server-side cursor: stream new messages instead of loading them all.
+    # WITH HOLD so it survives the per-batch commits below
+    read_cur = conn.cursor(name="new_messages", withhold=True)
+    read_cur.itersize = BATCH_SIZE
+    read_cur.execute(f"""
+    SELECT s.message_id, s.channel_username, s.message_text
+    FROM {STAGING_TABLE} s
+    LEFT JOIN raw.product_extraction_log l
+      ON s.message_id = l.message_id
+     AND s.channel_username = l.channel_username
+    WHERE l.message_id IS NULL
+    """)
+
+    processed = 0
+    mentions_found = 0
+    while True:
+        rows = read_cur.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+
+        mentions = [
+            (message_id, channel_username, *mention)
+            for message_id, channel_username, message_text in rows
+            for mention in extract_mentions(message_text, matcher, lexicon)
+        ]
+
+        execute_values(cur, """
+        INSERT INTO raw.product_mentions (
+            message_id, channel_username, product_name, matched_term, category, price, currency, price_etb
+        ) VALUES %s ON CONFLICT DO NOTHING
+        """, mentions, page_size=BATCH_SIZE)
+        execute_values(cur, """
+        INSERT INTO raw.product_extraction_log (message_id, channel_username)
+        VALUES %s ON CONFLICT DO NOTHING
+        """, [(row[0], row[1]) for row in rows], page_size=BATCH_SIZE)
+        conn.commit()
+
+        processed += len(rows)
+        mentions_found += len(mentions)
+
+    read_cur.close()
+    cur.close()
+    conn.close()
+
+    logger.info(
+        f"Processed {processed:,} new messages → {mentions_found:,} product mentions")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ import psycopg2
 from dotenv import load_dotenv
 import os
 
+from warehouse_writer import COUNTER_SNAPSHOTS_DDL
+
 load_dotenv()
 
 conn = psycopg2.connect(
@@ -41,6 +43,9 @@ CREATE TABLE raw.telegram_messages (
 );
 """)
 
+# Counter snapshots survive the reload (stg_telegram_messages reads them)
+cur.execute(COUNTER_SNAPSHOTS_DDL)
+
 # Scan data lake and load NDJSON
 data_root = Path("data/raw/telegram_messages")
 inserted = 0
@@ -8,17 +8,26 @@ Usage:
     uv run python src/scraper.py
     # or after activation: python src/scraper.py
 
+    # Streaming mode: only fetch posts newer than what is already in
+    # raw.telegram_messages and upsert them directly (JSONL is still written)
+    uv run python src/scraper.py --stream
+
+    # Counter refresh: re-fetch only views/forwards of recent messages
+    # (batched id lookups) and store changes in raw.message_counter_snapshots
+    uv run python src/scraper.py --refresh-counters --window-days 7
+
 Environment variables needed (.env):
     TELEGRAM_API_ID
     TELEGRAM_API_HASH
     TELEGRAM_PHONE          # optional - for first time login
 """
 
+import argparse
 import asyncio
 import json
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -27,10 +36,18 @@ from telethon.errors import (
     FloodWaitError,
     SessionPasswordNeededError,
 )
+from telethon.tl.functions.channels import GetMessagesRequest
 from telethon.tl.functions.messages import GetHistoryRequest
 from telethon.tl.types import MessageMediaPhoto
 from tqdm import tqdm
 
+from warehouse_writer import (
+    get_latest_message_ids,
+    get_recent_message_counters,
+    StreamWriter,
+    write_counter_snapshots,
+)
+
 # ─── CONFIGURATION
 
 load_dotenv()
@@ -61,6 +78,12 @@ LOGS_DIR = Path("logs")
 # How many messages to fetch per request
 LIMIT_PER_REQUEST = 100
 
+# Streaming mode: max batches waiting for the DB writer (backpressure)
+STREAM_QUEUE_SIZE = 50
+
+# Counter refresh: how far back (days) views/forwards are re-fetched
+REFRESH_WINDOW_DAYS = 7
+
 # LOGGING SETUP
 
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -99,8 +122,13 @@ async def get_client():
     return client
 
 
-async def scrape_channel(client: TelegramClient, channel: str):
-    """Scrape one channel - messages + download photos"""
+async def scrape_channel(client: TelegramClient, channel: str,
+                         writer: StreamWriter = None, min_id: int = 0):
+    """Scrape one channel - messages + download photos
+
+    If `writer` is given, every saved batch is also pushed to the streaming
+    DB writer. Only messages with id > `min_id` are fetched.
+    """
 
     try:
         entity = await client.get_entity(channel)
@@ -121,7 +149,7 @@ async def scrape_channel(client: TelegramClient, channel: str):
                         add_offset=0,
                         limit=LIMIT_PER_REQUEST,
                         max_id=0,
-                        min_id=0,
+                        min_id=min_id,
                         hash=0,
                     )
                 )
@@ -183,6 +211,9 @@ async def scrape_channel(client: TelegramClient, channel: str):
                         json.dump(msg, f, ensure_ascii=False)
                         f.write("\n")
 
+                if writer is not None and messages_batch:
+                    await writer.put(messages_batch)
+
                 total_saved += len(messages_batch)
                 offset_id = history.messages[-1].id
 
@@ -200,14 +231,119 @@ async def scrape_channel(client: TelegramClient, channel: str):
         logger.error(f"Error scraping {channel}: {str(e)}", exc_info=True)
 
 
-async def main():
+async def refresh_channel_counters(client: TelegramClient, channel: str,
+                                   known: dict, captured_at: datetime):
+    """Re-fetch views/forwards for known message ids of one channel.
+
+    Returns snapshot rows (only for messages whose counters changed).
+    """
+    snapshots = []
+
+    try:
+        entity = await client.get_entity(channel)
+        message_ids = sorted(known)
+
+        for start in range(0, len(message_ids), LIMIT_PER_REQUEST):
+            chunk = message_ids[start:start + LIMIT_PER_REQUEST]
+            while True:
+                try:
+                    result = await client(
+                        GetMessagesRequest(channel=entity, id=chunk))
+                    break
+                except FloodWaitError as e:
+                    logger.warning(
+                        f"Rate limit hit! Waiting {e.seconds} seconds...")
+                    await asyncio.sleep(e.seconds)
+
+            for message in result.messages:
+                views = getattr(message, "views", None)
+                if views is None:
+                    continue  # deleted (MessageEmpty) or service message
+                forwards = message.forwards or 0
+
+                old_views, old_forwards = known[message.id]
+                if views == old_views and forwards == old_forwards:
+                    continue
+
+                snapshots.append((
+                    message.id,
+                    channel,
+                    captured_at,
+                    views,
+                    forwards,
+                    views - old_views,
+                    forwards - old_forwards,
+                ))
+
+        logger.info(
+            f"Refreshed {channel} → {len(message_ids):,} checked, "
+            f"{len(snapshots):,} changed")
+
+    except Exception as e:
+        logger.error(
+            f"Error refreshing counters for {channel}: {str(e)}", exc_info=True)
+
+    return snapshots
+
+
+async def refresh_counters(window_days: int = REFRESH_WINDOW_DAYS):
+    """Counter refresh mode: update views/forwards of the last `window_days`"""
+    known = await asyncio.to_thread(get_recent_message_counters, window_days)
+    captured_at = datetime.now(timezone.utc)
+
+    async with await get_client() as client:
+        for channel, counters in known.items():
+            snapshots = await refresh_channel_counters(
+                client, channel, counters, captured_at)
+            await asyncio.to_thread(write_counter_snapshots, snapshots)
+
+
+async def main(stream: bool = False):
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
     MESSAGES_DIR.mkdir(parents=True, exist_ok=True)
 
-    async with await get_client() as client:
-        for channel in CHANNELS:
-            await scrape_channel(client, channel)
+    writer = None
+    latest_ids = {}
+    if stream:
+        # Connect before scraping so DB problems fail fast
+        latest_ids = await asyncio.to_thread(get_latest_message_ids)
+        writer = StreamWriter(maxsize=STREAM_QUEUE_SIZE)
+        await writer.start()
+
+    try:
+        async with await get_client() as client:
+            for channel in CHANNELS:
+                if writer is not None and writer.stopped:
+                    break  # writer died; close() below re-raises its error
+                await scrape_channel(client, channel, writer=writer,
+                                     min_id=latest_ids.get(channel, 0))
+    finally:
+        if writer is not None:
+            await writer.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--stream",
+        action="store_true",
+        help="fetch only new posts and upsert them straight into raw.telegram_messages",
+    )
+    mode.add_argument(
+        "--refresh-counters",
+        action="store_true",
+        help="re-fetch views/forwards of recent messages into raw.message_counter_snapshots",
+    )
+    parser.add_argument(
+        "--window-days",
+        type=int,
+        default=REFRESH_WINDOW_DAYS,
+        help="how many days back --refresh-counters looks (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    if args.refresh_counters:
+        asyncio.run(refresh_counters(args.window_days))
+    else:
+        asyncio.run(main(stream=args.stream))
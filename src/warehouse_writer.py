@@ -0,0 +1,249 @@
+"""
+Streaming writer: scraper batches → raw.telegram_messages
+---------------------------------------------------------
+Used by `src/scraper.py --stream`. The scraper pushes each fetched batch onto
+an asyncio queue; `run_writer` drains it and bulk-upserts into PostgreSQL, so
+new posts land in the warehouse without the JSONL → load_raw_to_pg round trip.
+
+Also used by `src/scraper.py --refresh-counters` to read the last known
+views/forwards of recent messages and store changed ones as delta snapshots
+in raw.message_counter_snapshots.
+"""
+
+import asyncio
+import logging
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Max rows per INSERT; queued batches are coalesced up to this size
+WRITE_BATCH_SIZE = 1000
+
+RAW_MESSAGES_DDL = """
+CREATE SCHEMA IF NOT EXISTS raw;
+
+CREATE TABLE IF NOT EXISTS raw.telegram_messages (
+    message_id       BIGINT,
+    channel_username TEXT,
+    channel_title    TEXT,
+    date             TIMESTAMP WITH TIME ZONE,
+    text             TEXT,
+    views            INTEGER,
+    forwards         INTEGER,
+    has_media        BOOLEAN,
+    image_path       TEXT,
+    loaded_at        TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (message_id, channel_username)
+);
+"""
+
+# Only counters that changed since the previous capture are stored
+COUNTER_SNAPSHOTS_DDL = """
+CREATE SCHEMA IF NOT EXISTS raw;
+
+CREATE TABLE IF NOT EXISTS raw.message_counter_snapshots (
+    message_id       BIGINT,
+    channel_username TEXT,
+    captured_at      TIMESTAMP WITH TIME ZONE,
+    views            INTEGER,
+    forwards         INTEGER,
+    views_delta      INTEGER,
+    forwards_delta   INTEGER,
+    PRIMARY KEY (message_id, channel_username, captured_at)
+);
+"""
+
+
+def get_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "medical_warehouse"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", 5432)
+    )
+
+
+def get_latest_message_ids():
+    """channel_username -> newest message_id already in the warehouse"""
+    conn = get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute(RAW_MESSAGES_DDL)
+        cur.execute(COUNTER_SNAPSHOTS_DDL)
+        cur.execute("""
+        SELECT channel_username, MAX(message_id)
+        FROM raw.telegram_messages
+        GROUP BY channel_username
+        """)
+        latest = dict(cur.fetchall())
+    conn.close()
+    return latest
+
+
+def get_recent_message_counters(window_days):
+    """channel_username -> {message_id: (views, forwards)} for messages posted
+    in the last `window_days`, using the latest snapshot when there is one"""
+    conn = get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute(RAW_MESSAGES_DDL)
+        cur.execute(COUNTER_SNAPSHOTS_DDL)
+        cur.execute("""
+        SELECT
+            m.channel_username,
+            m.message_id,
+            COALESCE(s.views, m.views, 0),
+            COALESCE(s.forwards, m.forwards, 0)
+        FROM raw.telegram_messages m
+        LEFT JOIN LATERAL (
+            SELECT views, forwards
+            FROM raw.message_counter_snapshots s
+            WHERE s.message_id = m.message_id
+              AND s.channel_username = m.channel_username
+            ORDER BY s.captured_at DESC
+            LIMIT 1
+        ) s ON TRUE
+        WHERE m.date >= NOW() - make_interval(days => %s)
+        """, (window_days,))
+        counters = {}
+        for channel_username, message_id, views, forwards in cur:
+            counters.setdefault(channel_username, {})[
+                message_id] = (views, forwards)
+    conn.close()
+    return counters
+
+
+def write_counter_snapshots(snapshots):
+    """Store changed counters and bump them on the raw row, so the
+    incremental fct_messages build picks the new numbers up"""
+    if not snapshots:
+        return
+
+    conn = get_connection()
+    with conn, conn.cursor() as cur:
+        execute_values(cur, """
+        INSERT INTO raw.message_counter_snapshots (
+            message_id, channel_username, captured_at, views, forwards, views_delta, forwards_delta
+        ) VALUES %s ON CONFLICT DO NOTHING
+        """, snapshots, page_size=WRITE_BATCH_SIZE)
+        execute_values(cur, """
+        UPDATE raw.telegram_messages m SET
+            views = v.views,
+            forwards = v.forwards,
+            loaded_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v (message_id, channel_username, views, forwards)
+        WHERE m.message_id = v.message_id
+          AND m.channel_username = v.channel_username
+        """, [(s[0], s[1], s[3], s[4]) for s in snapshots], page_size=WRITE_BATCH_SIZE)
+    conn.close()
+
+
+def upsert_messages(conn, messages):
+    """Insert new messages, refresh text/counters of ones already loaded"""
+    with conn, conn.cursor() as cur:
+        execute_values(cur, """
+        INSERT INTO raw.telegram_messages (
+            message_id, channel_username, channel_title, date, text, views, forwards, has_media, image_path
+        ) VALUES %s
+        ON CONFLICT (message_id, channel_username) DO UPDATE SET
+            text = EXCLUDED.text,
+            views = EXCLUDED.views,
+            forwards = EXCLUDED.forwards,
+            image_path = EXCLUDED.image_path,
+            loaded_at = CURRENT_TIMESTAMP
+        """, [(
+            msg["message_id"],
+            msg["channel_username"],
+            msg["channel_title"],
+            msg["date"],
+            msg["text"],
+            msg["views"],
+            msg["forwards"],
+            msg["has_media"],
+            msg["image_path"],
+        ) for msg in messages], page_size=WRITE_BATCH_SIZE)
+
+
+async def run_writer(queue: asyncio.Queue, conn):
+    """Drain message batches from `queue` until a None sentinel arrives.
+
+    DB writes run in a worker thread so scraping is never blocked on them.
+    Any write error ends the task; `StreamWriter.put` then raises instead of
+    waiting on a queue nobody drains.
+    """
+    total_written = 0
+    done = False
+
+    try:
+        while not done:
+            pending = await queue.get()
+            if pending is None:
+                break
+            pending = list(pending)
+
+            # Coalesce whatever else is already queued into one round trip
+            while len(pending) < WRITE_BATCH_SIZE and not queue.empty():
+                batch = queue.get_nowait()
+                if batch is None:
+                    done = True
+                    break
+                pending.extend(batch)
+
+            if pending:
+                await asyncio.to_thread(upsert_messages, conn, pending)
+                total_written += len(pending)
+    except psycopg2.Error as e:
+        logger.error(f"Stream writer failed: {e}", exc_info=True)
+        raise
+    finally:
+        conn.close()
+
+    logger.info(f"Stream writer → {total_written:,} messages upserted")
+    return total_written
+
+
+class StreamWriter:
+    """Bounded queue + background `run_writer` task for `scraper.py --stream`.
+
+    The DB connection is opened in `start()`, before any scraping, and `put()`
+    waits on the queue *and* the writer task, so a writer that died can never
+    leave the scraper blocked on a full queue.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.task = None
+
+    async def start(self):
+        conn = await asyncio.to_thread(get_connection)
+        self.task = asyncio.create_task(run_writer(self.queue, conn))
+
+    @property
+    def stopped(self):
+        return self.task is None or self.task.done()
+
+    def _raise_stopped(self):
+        if self.task is not None:
+            self.task.result()  # re-raises the writer's own error
+        raise RuntimeError("Stream writer is not running")
+
+    async def put(self, batch):
+        if self.stopped:
+            self._raise_stopped()
+
+        put = asyncio.ensure_future(self.queue.put(batch))
+        await asyncio.wait({put, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            self._raise_stopped()
+
+    async def close(self):
+        """Send the sentinel and wait for the queued batches to be written"""
+        if not self.stopped:
+            await self.put(None)
+        return await self.task
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# src/ scripts are run as `python src/<script>.py`, not installed as a package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
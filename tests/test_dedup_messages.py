@@ -0,0 +1,58 @@
+import dedup_messages as dm
+
+
+def make_message(message_id, text, channel="chemed123"):
+    signature = dm.minhash_signature(dm.normalize_text(text))
+    buckets = dm.lsh_buckets(signature) if signature is not None else []
+    return (message_id, channel, signature, buckets, dm.dosage_tokens(text))
+
+
+AD = ("Paracetamol 500mg tablets available now in our Bole branch, "
+      "free delivery inside Addis, price 350 birr call 0911223344")
+REPOST = ("Paracetamol 500 mg tablets available now in our Bole branch!! "
+          "free delivery inside Addis, price 400 birr call 0922334455")
+OTHER_DOSE = AD.replace("500mg", "1000mg")
+DISCOUNT = ("Vitamin C 1000mg effervescent tablets, 10% off this week only "
+            "at all our branches, order by phone or visit the pharmacy")
+DISCOUNT_REPOST = DISCOUNT.replace("10% off", "20% off")
+UNRELATED = "Amoxicillin 250mg capsules, new stock arrived this morning"
+
+
+def canonical_of(clusters):
+    return {(c[0], c[1]): (c[2], c[3]) for c in clusters}
+
+
+def test_normalize_masks_prices_keeps_dosages():
+    assert dm.normalize_text("Paracetamol 500 mg, price 350 birr, call 0911223344") == \
+        "paracetamol 500mg price 0 birr call 0"
+
+
+def test_cluster_within_one_run():
+    clusters, new_signatures, _ = dm.cluster_messages(
+        [make_message(1, AD),
+         make_message(2, REPOST, channel="tikvahpharma"),
+         make_message(3, OTHER_DOSE),
+         make_message(4, UNRELATED),
+         make_message(5, DISCOUNT),
+         make_message(6, DISCOUNT_REPOST)],
+        {}, {})
+
+    canonical = canonical_of(clusters)
+    assert canonical[(2, "tikvahpharma")] == (1, "chemed123")
+    assert canonical[(3, "chemed123")] == (3, "chemed123")  # different dosage
+    assert canonical[(4, "chemed123")] == (4, "chemed123")
+    assert canonical[(6, "chemed123")] == (5, "chemed123")  # only % differs
+    assert [s[0] for s in new_signatures] == [1, 3, 4, 5]
+
+
+def test_cluster_against_existing_index():
+    index, signatures = {}, {}
+    dm.cluster_messages([make_message(1, AD)], index, signatures)
+
+    # Next run only sees the persisted index of canonical messages
+    clusters, new_signatures, new_buckets = dm.cluster_messages(
+        [make_message(10, REPOST)], index, signatures)
+
+    assert canonical_of(clusters)[(10, "chemed123")] == (1, "chemed123")
+    assert new_signatures == []
+    assert new_buckets == []
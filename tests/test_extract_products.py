@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+import extract_products as ep
+
+LEXICON_CSV = Path(__file__).resolve(
+).parents[1] / "medical_warehouse/seeds/product_lexicon.csv"
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return ep.load_lexicon(LEXICON_CSV)
+
+
+@pytest.fixture(scope="module")
+def matcher(lexicon):
+    return ep.build_matcher(lexicon)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("etb 1,200", (1200.0, "ETB")),
+    ("only 1,250.50 birr", (1250.5, "ETB")),
+    ("450 ብር", (450.0, "ETB")),
+    ("350br", (350.0, "ETB")),
+    ("$30", (30.0, "USD")),
+    ("25 usd", (25.0, "USD")),
+    ("price: 350", (350.0, "ETB")),
+    ("price 10 usd", (10.0, "USD")),
+])
+def test_find_prices_currencies(text, expected):
+    assert [p[1:] for p in ep.find_prices(text)] == [expected]
+
+
+@pytest.mark.parametrize("text", [
+    "etb 99999999999999",   # overlong number
+    "price: 0911223344",    # phone number after "price:"
+    "sabr 12",              # currency letters inside a word
+    "500mg",                # dosage, not a price
+    "panadol price 500mg tablets",  # dosage right after "price"
+    "price: 250 mg caps",
+])
+def test_find_prices_ignores_non_prices(text):
+    assert ep.find_prices(text) == []
+
+
+def test_matcher_prefers_longest_term():
+    matcher = ep.build_matcher(["cipro", "ciprofloxacin"])
+    assert [m.group(0) for m in matcher.finditer("ciprofloxacin 500mg")] == [
+        "ciprofloxacin"]
+    assert [m.group(0) for m in matcher.finditer("cipro 250mg")] == ["cipro"]
+    assert list(matcher.finditer("ciproxyz")) == []
+
+
+def test_extract_mentions_assigns_following_price(lexicon, matcher):
+    mentions = ep.extract_mentions(
+        "Panadol 500mg Price: 350 birr, Amoxicillin 250mg ETB 1,200", matcher, lexicon)
+    assert [(m[0], m[1], m[3], m[5]) for m in mentions] == [
+        ("Paracetamol", "panadol", 350.0, 350.0),
+        ("Amoxicillin", "amoxicillin", 1200.0, 1200.0),
+    ]
+
+
+def test_extract_mentions_skips_dosage_after_price_keyword(lexicon, matcher):
+    mentions = ep.extract_mentions(
+        "Amoxicillin price: 250 mg caps, 120 birr", matcher, lexicon)
+    assert [(m[0], m[3], m[5]) for m in mentions] == [
+        ("Amoxicillin", 120.0, 120.0)]
+
+
+def test_extract_mentions_single_price_shared_and_deduplicated(lexicon, matcher):
+    mentions = ep.extract_mentions(
+        "Vitamin C, zinc and more vitamin c — 450 ብር", matcher, lexicon)
+    assert [(m[0], m[3]) for m in mentions] == [
+        ("Vitamin C", 450.0), ("Zinc", 450.0)]
+
+
+def test_extract_mentions_without_products(lexicon, matcher):
+    assert ep.extract_mentions("Open on Sunday, 350 birr delivery", matcher, lexicon) == []
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import psycopg2
+import pytest
+
+import warehouse_writer as ww
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(ww, "get_connection", lambda: conn)
+    return conn
+
+
+def run(coro):
+    # A writer that deadlocks fails the test instead of hanging it
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def test_stream_writer_coalesces_batches(monkeypatch, conn):
+    written = []
+    release = threading.Event()
+
+    def fake_upsert(_, messages):
+        release.wait(timeout=5)  # hold the first write so later batches queue up
+        written.append([msg["message_id"] for msg in messages])
+
+    monkeypatch.setattr(ww, "upsert_messages", fake_upsert)
+    batches = [[{"message_id": i}, {"message_id": i + 1}]
+               for i in range(0, 8, 2)]
+
+    async def scenario():
+        writer = ww.StreamWriter(maxsize=10)
+        await writer.start()
+        for batch in batches:
+            await writer.put(batch)
+        release.set()
+        return await writer.close()
+
+    assert run(scenario()) == 8
+    assert [i for write in written for i in write] == list(range(8))
+    assert len(written) < len(batches)
+    assert conn.closed
+
+
+def test_stream_writer_raises_write_error(monkeypatch, conn):
+    def failing_upsert(_, messages):
+        raise psycopg2.OperationalError("server closed the connection")
+
+    monkeypatch.setattr(ww, "upsert_messages", failing_upsert)
+
+    async def scenario():
+        writer = ww.StreamWriter(maxsize=1)
+        await writer.start()
+        with pytest.raises(psycopg2.OperationalError):
+            for i in range(10):
+                await writer.put([{"message_id": i}])
+        assert writer.stopped
+        with pytest.raises(psycopg2.OperationalError):
+            await writer.close()
+
+    run(scenario())
+    assert conn.closed